@@ -1,9 +1,57 @@
-from kubernetes import client, config
+from kubernetes import client, config, watch
 from kubernetes.client.rest import ApiException
+from kubernetes.stream import stream
+from typing import Optional
 import logging
+import threading
+import time
 
 logger = logging.getLogger(__name__)
 
+# Label selector identifying store namespaces
+STORE_NAMESPACE_SELECTOR = "app=store"
+
+# Prefix of every store namespace
+STORE_NAMESPACE_PREFIX = "store-"
+
+# Label carried by the WordPress pod of every store
+WORDPRESS_POD_LABEL = ("app.kubernetes.io/name", "wordpress")
+
+# Field manager recorded on objects the platform writes
+FIELD_MANAGER = "store-provisioning"
+
+# Max pooled HTTP connections to the API server (urllib3 default is 4)
+CONNECTION_POOL_MAXSIZE = 100
+
+# Back-off before re-establishing a broken watch
+WATCH_RETRY_DELAY_SECONDS = 5
+
+
+def _version_of(obj) -> int:
+    """Resource version of an API object as an int (0 if missing or not numeric)"""
+    try:
+        return int(obj.metadata.resource_version)
+    except (TypeError, ValueError, AttributeError):
+        return 0
+
+
+def _merge_listed(cached: dict, listed: dict, list_version: int) -> dict:
+    """
+    Merge a fresh LIST into a cache without going back in time
+    
+    Listed objects replace cached ones unless the cached copy is newer, and
+    cached objects missing from the list are only kept if they were written
+    after the list was taken.
+    """
+    merged = {
+        key: cached[key] if key in cached and _version_of(cached[key]) > _version_of(obj) else obj
+        for key, obj in listed.items()
+    }
+    for key, obj in cached.items():
+        if key not in listed and _version_of(obj) > list_version:
+            merged[key] = obj
+    return merged
+
 
 class KubernetesManager:
     """Handles all Kubernetes API operations"""
@@ -13,12 +61,181 @@ class KubernetesManager:
         try:
             # Load kubeconfig from default location (~/.kube/config)
             config.load_kube_config()
-            self.v1 = client.CoreV1Api()
-            self.networking_v1 = client.NetworkingV1Api()
+            
+            # Share one connection pool between all API groups
+            cfg = client.Configuration.get_default_copy()
+            cfg.connection_pool_maxsize = CONNECTION_POOL_MAXSIZE
+            client.Configuration.set_default(cfg)
+            self.api_client = client.ApiClient(cfg)
+            
+            self.v1 = client.CoreV1Api(self.api_client)
+            self.networking_v1 = client.NetworkingV1Api(self.api_client)
+            
+            # stream() temporarily swaps the client's request method for a
+            # websocket one, so exec gets its own client and is serialized
+            self._exec_v1 = client.CoreV1Api(client.ApiClient(cfg))
+            self._exec_lock = threading.Lock()
             logger.info("Kubernetes configuration loaded successfully")
         except Exception as e:
             logger.error(f"Failed to load Kubernetes config: {e}")
             raise
+        
+        # Informer caches, kept current by the watch threads
+        self._cache_lock = threading.RLock()
+        self._ns_cache: dict[str, client.V1Namespace] = {}
+        self._pod_cache: dict[str, dict[str, client.V1Pod]] = {}
+        # Newest resource version each watch has applied, by kind
+        self._seen_versions: dict[str, int] = {}
+        self._start_informers()
+    
+    def _start_informers(self):
+        """Prime the caches with a full list and start the watch threads"""
+        ns_version = pod_version = None
+        try:
+            ns_version = self._resync_namespaces()
+            pod_version = self._resync_pods()
+        except Exception as e:
+            # The watch threads keep re-listing until the API becomes reachable
+            logger.error(f"Initial cache sync failed: {e}")
+        
+        threading.Thread(
+            target=self._run_watch,
+            args=("Namespace", self.v1.list_namespace, self._resync_namespaces, self._apply_namespace_event, ns_version),
+            kwargs={"label_selector": STORE_NAMESPACE_SELECTOR},
+            name="namespace-informer",
+            daemon=True
+        ).start()
+        threading.Thread(
+            target=self._run_watch,
+            args=("Pod", self.v1.list_pod_for_all_namespaces, self._resync_pods, self._apply_pod_event, pod_version),
+            name="pod-informer",
+            daemon=True
+        ).start()
+    
+    def _list_since(self, kind: str, list_func, **kwargs):
+        """
+        LIST a resource, never returning data older than its watch has applied
+        
+        resource_version="0" lets the API server answer from its watch cache,
+        which may lag behind; in that case the LIST is repeated as a
+        consistent read.
+        """
+        result = list_func(resource_version="0", **kwargs)
+        with self._cache_lock:
+            seen_version = self._seen_versions.get(kind, 0)
+        if int(result.metadata.resource_version or 0) < seen_version:
+            result = list_func(**kwargs)
+        return result
+    
+    def _resync_namespaces(self) -> str:
+        """
+        Merge a fresh list into the namespace cache
+        
+        Returns:
+            Resource version to start watching from
+        """
+        namespaces = self._list_since("Namespace", self.v1.list_namespace, label_selector=STORE_NAMESPACE_SELECTOR)
+        listed = {ns.metadata.name: ns for ns in namespaces.items}
+        list_version = int(namespaces.metadata.resource_version or 0)
+        with self._cache_lock:
+            self._ns_cache = _merge_listed(self._ns_cache, listed, list_version)
+        return namespaces.metadata.resource_version
+    
+    def _resync_pods(self) -> str:
+        """
+        Merge a fresh list of pods in store namespaces into the pod cache
+        
+        Returns:
+            Resource version to start watching from
+        """
+        pods = self._list_since("Pod", self.v1.list_pod_for_all_namespaces)
+        listed = {
+            (pod.metadata.namespace, pod.metadata.name): pod
+            for pod in pods.items
+            if pod.metadata.namespace.startswith(STORE_NAMESPACE_PREFIX)
+        }
+        list_version = int(pods.metadata.resource_version or 0)
+        with self._cache_lock:
+            cached = {
+                (namespace, name): pod
+                for namespace, ns_pods in self._pod_cache.items()
+                for name, pod in ns_pods.items()
+            }
+            pod_cache = {}
+            for (namespace, name), pod in _merge_listed(cached, listed, list_version).items():
+                pod_cache.setdefault(namespace, {})[name] = pod
+            self._pod_cache = pod_cache
+        return pods.metadata.resource_version
+    
+    def _run_watch(self, kind: str, list_func, resync, apply_event, resource_version: str = None, **kwargs):
+        """
+        Keep a watch open and feed its events into a cache
+        
+        The watch is resumed from the last seen resource version whenever the
+        API server closes it, and bookmarks keep that version current without
+        a re-list. A full re-list only happens when the version has expired
+        (410 Gone) or the watch fails.
+        
+        Args:
+            kind: Resource kind, for logging
+            list_func: API list function to watch
+            resync: Function that re-lists into the cache and returns the resource version
+            apply_event: Function applying an (event type, object) pair to the cache
+            resource_version: Version to resume from, or None to re-list first
+            **kwargs: Extra arguments for list_func
+        """
+        while True:
+            try:
+                if resource_version is None:
+                    resource_version = resync()
+                for event in watch.Watch().stream(
+                    list_func,
+                    resource_version=resource_version,
+                    allow_watch_bookmarks=True,
+                    timeout_seconds=0,
+                    **kwargs
+                ):
+                    if event["type"] == "BOOKMARK":
+                        resource_version = event["raw_object"]["metadata"]["resourceVersion"]
+                    else:
+                        apply_event(event["type"], event["object"])
+                        resource_version = event["object"].metadata.resource_version
+                    with self._cache_lock:
+                        self._seen_versions[kind] = int(resource_version)
+            except Exception as e:
+                resource_version = None
+                if isinstance(e, ApiException) and e.status == 410:
+                    logger.info(f"{kind} watch expired, re-listing")
+                    continue
+                logger.warning(f"{kind} watch interrupted, re-listing: {e}")
+                time.sleep(WATCH_RETRY_DELAY_SECONDS)
+    
+    def _apply_namespace_event(self, event_type: str, ns: client.V1Namespace):
+        """Apply a namespace watch event to the namespace cache"""
+        with self._cache_lock:
+            if event_type == "DELETED":
+                self._ns_cache.pop(ns.metadata.name, None)
+                self._pod_cache.pop(ns.metadata.name, None)
+            elif _version_of(ns) >= _version_of(self._ns_cache.get(ns.metadata.name)):
+                self._ns_cache[ns.metadata.name] = ns
+    
+    def _apply_pod_event(self, event_type: str, pod: client.V1Pod):
+        """Apply a pod watch event for a store namespace to the pod cache"""
+        namespace = pod.metadata.namespace
+        if not namespace.startswith(STORE_NAMESPACE_PREFIX):
+            return
+        with self._cache_lock:
+            if event_type == "DELETED":
+                self._pod_cache.get(namespace, {}).pop(pod.metadata.name, None)
+            else:
+                ns_pods = self._pod_cache.setdefault(namespace, {})
+                if _version_of(pod) >= _version_of(ns_pods.get(pod.metadata.name)):
+                    ns_pods[pod.metadata.name] = pod
+    
+    @staticmethod
+    def ns_of(name: str) -> str:
+        """Namespace name of a store"""
+        return STORE_NAMESPACE_PREFIX + name
     
     def test_connection(self) -> bool:
         """Test if Kubernetes API is accessible"""
@@ -39,32 +256,31 @@ class KubernetesManager:
             annotations: Additional annotations for the namespace (can contain any characters)
             
         Returns:
-            True if successful, False otherwise
+            True if created, False if the namespace already exists
         """
-        namespace = f"store-{name}"
+        namespace = self.ns_of(name)
         
-        default_labels = {
-            "app": "store",
-            "store-name": name,
-            "managed-by": "store-provisioning-platform"
+        ns_body = {
+            "apiVersion": "v1",
+            "kind": "Namespace",
+            "metadata": {
+                "name": namespace,
+                "labels": {
+                    "app": "store",
+                    "store-name": name,
+                    "managed-by": "store-provisioning-platform",
+                    **(labels or {})
+                },
+                "annotations": annotations or {}
+            }
         }
         
-        if labels:
-            default_labels.update(labels)
-        
-        default_annotations = {}
-        if annotations:
-            default_annotations.update(annotations)
-        
         try:
-            ns_body = client.V1Namespace(
-                metadata=client.V1ObjectMeta(
-                    name=namespace,
-                    labels=default_labels,
-                    annotations=default_annotations if default_annotations else None
-                )
-            )
-            self.v1.create_namespace(ns_body)
+            # A plain create is the authoritative existence check: it can never
+            # modify a namespace that already belongs to another store
+            created = self.v1.create_namespace(ns_body, field_manager=FIELD_MANAGER)
+            with self._cache_lock:
+                self._ns_cache[namespace] = created
             logger.info(f"Created namespace: {namespace}")
             return True
         except ApiException as e:
@@ -76,40 +292,32 @@ class KubernetesManager:
     
     def list_store_namespaces(self) -> list[dict]:
         """
-        List all store namespaces
+        List all store namespaces (served from the informer cache)
         
         Returns:
             List of dictionaries with namespace info
         """
-        try:
-            namespaces = self.v1.list_namespace(label_selector="app=store")
-            result = []
-            
-            for ns in namespaces.items:
-                annotations = ns.metadata.annotations or {}
-                result.append({
-                    "name": ns.metadata.name,
-                    "store_name": ns.metadata.labels.get("store-name", "unknown"),
-                    "created": ns.metadata.creation_timestamp.isoformat() if ns.metadata.creation_timestamp else None,
-                    "created_at": annotations.get("store.urumi.ai/created-at"),
-                    "status": ns.status.phase
-                })
-            
-            return result
-        except ApiException as e:
-            logger.error(f"Failed to list store namespaces: {e}")
-            return []
+        with self._cache_lock:
+            namespaces = list(self._ns_cache.values())
+        
+        result = []
+        for ns in namespaces:
+            annotations = ns.metadata.annotations or {}
+            result.append({
+                "name": ns.metadata.name,
+                "store_name": ns.metadata.labels.get("store-name", "unknown"),
+                "created": ns.metadata.creation_timestamp.isoformat() if ns.metadata.creation_timestamp else None,
+                "created_at": annotations.get("store.urumi.ai/created-at"),
+                "status": ns.status.phase
+            })
+        
+        return result
     
     def namespace_exists(self, name: str) -> bool:
-        """Check if a namespace exists"""
-        namespace = f"store-{name}"
-        try:
-            self.v1.read_namespace(namespace)
-            return True
-        except ApiException as e:
-            if e.status == 404:
-                return False
-            raise
+        """Check if a store namespace exists (served from the informer cache)"""
+        namespace = self.ns_of(name)
+        with self._cache_lock:
+            return namespace in self._ns_cache
     
     def delete_namespace(self, name: str) -> bool:
         """
@@ -121,7 +329,7 @@ class KubernetesManager:
         Returns:
             True if successful, False otherwise
         """
-        namespace = f"store-{name}"
+        namespace = self.ns_of(name)
         try:
             self.v1.delete_namespace(namespace)
             logger.info(f"Deleted namespace: {namespace}")
@@ -133,19 +341,97 @@ class KubernetesManager:
             logger.error(f"Failed to delete namespace {namespace}: {e}")
             raise
     
+    @staticmethod
+    def _pod_summary(pod: client.V1Pod) -> dict:
+        """Reduce a pod to the fields reported by the API"""
+        return {
+            "name": pod.metadata.name,
+            "status": pod.status.phase,
+            "ready": all(cs.ready for cs in pod.status.container_statuses) if pod.status.container_statuses else False
+        }
+    
     def get_pods_in_namespace(self, name: str) -> list[dict]:
-        """Get all pods in a store namespace"""
-        namespace = f"store-{name}"
+        """Get all pods in a store namespace (served from the informer cache)"""
+        namespace = self.ns_of(name)
+        with self._cache_lock:
+            pods = list(self._pod_cache.get(namespace, {}).values())
+        return [self._pod_summary(pod) for pod in pods]
+    
+    def get_all_store_pods(self) -> dict[str, list[dict]]:
+        """
+        Get the pods of every store namespace in one pass (served from the informer cache)
+        
+        Returns:
+            Dictionary mapping namespace name to its list of pod info
+        """
+        with self._cache_lock:
+            snapshot = {namespace: list(pods.values()) for namespace, pods in self._pod_cache.items()}
+        return {
+            namespace: [self._pod_summary(pod) for pod in pods]
+            for namespace, pods in snapshot.items()
+        }
+    
+    def _find_wordpress_pod(self, name: str) -> Optional[client.V1Pod]:
+        """Find the WordPress pod of a store in the informer cache"""
+        namespace = self.ns_of(name)
+        key, value = WORDPRESS_POD_LABEL
+        with self._cache_lock:
+            pods = list(self._pod_cache.get(namespace, {}).values())
+        for pod in pods:
+            if (pod.metadata.labels or {}).get(key) == value:
+                return pod
+        return None
+    
+    def get_wordpress_pod_name(self, name: str) -> Optional[str]:
+        """Get the WordPress pod name of a store (served from the informer cache)"""
+        pod = self._find_wordpress_pod(name)
+        return pod.metadata.name if pod else None
+    
+    def is_wordpress_ready(self, name: str) -> bool:
+        """Check if all containers of a store's WordPress pod are ready (served from the informer cache)"""
+        pod = self._find_wordpress_pod(name)
+        if not pod or not pod.status or not pod.status.container_statuses:
+            return False
+        return all(cs.ready for cs in pod.status.container_statuses)
+    
+    def exec_in_pod(self, namespace: str, pod_name: str, command: list[str], timeout: int = 300) -> tuple[bool, str, str]:
+        """
+        Run a command inside a pod over the API server exec websocket
+        
+        Args:
+            namespace: Kubernetes namespace
+            pod_name: Name of the pod
+            command: Command as list of strings
+            timeout: Timeout in seconds
+            
+        Returns:
+            Tuple of (success, stdout, stderr)
+        """
         try:
-            pods = self.v1.list_namespaced_pod(namespace)
-            return [
-                {
-                    "name": pod.metadata.name,
-                    "status": pod.status.phase,
-                    "ready": all(cs.ready for cs in pod.status.container_statuses) if pod.status.container_statuses else False
-                }
-                for pod in pods.items
-            ]
-        except ApiException as e:
-            logger.error(f"Failed to get pods in namespace {namespace}: {e}")
-            return []
+            with self._exec_lock:
+                resp = stream(
+                    self._exec_v1.connect_get_namespaced_pod_exec,
+                    pod_name,
+                    namespace,
+                    command=command,
+                    stderr=True,
+                    stdout=True,
+                    stdin=False,
+                    tty=False,
+                    _preload_content=False
+                )
+            try:
+                resp.run_forever(timeout=timeout)
+                # Only read what is already buffered: with the default timeout
+                # a read on a still-open socket blocks until the next frame
+                if resp.is_open():
+                    logger.error(f"Exec timed out after {timeout}s: {' '.join(command)}")
+                    return False, resp.read_stdout(timeout=0), f"Command timed out after {timeout}s"
+                stdout = resp.read_stdout(timeout=0)
+                stderr = resp.read_stderr(timeout=0)
+                return resp.returncode == 0, stdout, stderr
+            finally:
+                resp.close()
+        except Exception as e:
+            logger.error(f"Exec in pod {namespace}/{pod_name} failed: {e}")
+            return False, "", str(e)
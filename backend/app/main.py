@@ -1,6 +1,11 @@
-from fastapi import FastAPI, HTTPException, status
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from fastapi import Depends, FastAPI, HTTPException, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
+import asyncio
 import logging
+from typing import Optional
 from app.models import (
     CreateStoreRequest,
     CreateStoreResponse,
@@ -18,11 +23,30 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Size of the event loop's default executor, which runs every blocking
+# Kubernetes API call offloaded with asyncio.to_thread. Reads served from the
+# informer cache are in-memory and run directly on the event loop.
+THREADPOOL_SIZE = 200
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Size the default executor and warm up the Store Manager in the background"""
+    executor = ThreadPoolExecutor(max_workers=THREADPOOL_SIZE, thread_name_prefix="blocking-io")
+    asyncio.get_running_loop().set_default_executor(executor)
+    warm_up = asyncio.create_task(_warm_up_store_manager())
+    yield
+    warm_up.cancel()
+    executor.shutdown(wait=False)
+
+
 # Create FastAPI app
 app = FastAPI(
     title="Store Provisioning API",
     description="API for provisioning WooCommerce stores on Kubernetes",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan
 )
 
 # Add CORS middleware (for React frontend)
@@ -34,17 +58,47 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize store manager
-try:
-    store_mgr = StoreManager()
-    logger.info("Store Manager initialized successfully")
-except Exception as e:
-    logger.error(f"Failed to initialize Store Manager: {e}")
-    store_mgr = None
+# Store manager is built lazily by the first request that needs it
+_store_mgr: Optional[StoreManager] = None
+_store_mgr_lock = asyncio.Lock()
+
+
+async def get_store_manager() -> StoreManager:
+    """
+    Dependency providing the shared Store Manager
+    
+    Once built, the instance is returned without locking or a thread hop.
+    Initialization is retried on the next request if it fails.
+    """
+    global _store_mgr
+    if _store_mgr is not None:
+        return _store_mgr
+    
+    async with _store_mgr_lock:
+        if _store_mgr is None:
+            try:
+                _store_mgr = await asyncio.to_thread(StoreManager)
+                logger.info("Store Manager initialized successfully")
+            except Exception as e:
+                logger.error(f"Failed to initialize Store Manager: {e}")
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="Store Manager not initialized"
+                )
+    return _store_mgr
+
+
+async def _warm_up_store_manager():
+    """Build the Store Manager and pre-pull the chart without delaying startup"""
+    try:
+        store_mgr = await get_store_manager()
+        await store_mgr.warm_up()
+    except Exception as e:
+        logger.warning(f"Store Manager warm-up failed, will retry on first request: {e}")
 
 
 @app.get("/", tags=["Status"])
-def read_root():
+async def read_root():
     """API root endpoint"""
     return {
         "status": "running",
@@ -59,7 +113,7 @@ def read_root():
 
 
 @app.get("/health", response_model=HealthResponse, tags=["Status"])
-def health_check():
+async def health_check(store_mgr: StoreManager = Depends(get_store_manager)):
     """
     Health check endpoint
     
@@ -68,14 +122,10 @@ def health_check():
     - Kubernetes connection
     - Helm installation
     """
-    if not store_mgr:
-        raise HTTPException(
-            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-            detail="Store Manager not initialized"
-        )
-    
-    k8s_connected = store_mgr.k8s.test_connection()
-    helm_installed = store_mgr.check_helm_installed()
+    k8s_connected, helm_installed = await asyncio.gather(
+        asyncio.to_thread(store_mgr.k8s.test_connection),
+        store_mgr.check_helm_installed()
+    )
     
     healthy = k8s_connected and helm_installed
     
@@ -87,7 +137,7 @@ def health_check():
 
 
 @app.post("/stores", response_model=CreateStoreResponse, status_code=status.HTTP_201_CREATED, tags=["Stores"])
-def create_store(request: CreateStoreRequest):
+async def create_store(request: CreateStoreRequest, store_mgr: StoreManager = Depends(get_store_manager)):
     """
     Create a new WooCommerce store
     
@@ -99,16 +149,10 @@ def create_store(request: CreateStoreRequest):
     
     **Note:** Store creation takes 2-3 minutes
     """
-    if not store_mgr:
-        raise HTTPException(
-            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-            detail="Store Manager not initialized"
-        )
-    
     logger.info(f"Received request to create store: {request.store_name}")
     
     try:
-        result = store_mgr.create_store(
+        result = await store_mgr.create_store(
             store_name=request.store_name,
             owner_email=request.owner_email
         )
@@ -128,18 +172,12 @@ def create_store(request: CreateStoreRequest):
 
 
 @app.get("/stores", response_model=StoreListResponse, tags=["Stores"])
-def list_stores():
+async def list_stores(store_mgr: StoreManager = Depends(get_store_manager)):
     """
     List all WooCommerce stores
     
     Returns list of all stores with their details
     """
-    if not store_mgr:
-        raise HTTPException(
-            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-            detail="Store Manager not initialized"
-        )
-    
     try:
         stores = store_mgr.list_stores()
         
@@ -150,6 +188,7 @@ def list_stores():
                 url=store["url"],
                 admin_url=store["admin_url"],
                 status=store.get("status", "active"),
+                ready=store.get("ready", False),
                 created_at=store.get("created_at")
             )
             for store in stores
@@ -169,18 +208,12 @@ def list_stores():
 
 
 @app.get("/stores/{store_name}", response_model=dict, tags=["Stores"])
-def get_store_status(store_name: str):
+async def get_store_status(store_name: str, store_mgr: StoreManager = Depends(get_store_manager)):
     """
     Get detailed status of a specific store
     
     Includes pod status and readiness information
     """
-    if not store_mgr:
-        raise HTTPException(
-            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-            detail="Store Manager not initialized"
-        )
-    
     try:
         status_info = store_mgr.get_store_status(store_name)
         
@@ -192,7 +225,7 @@ def get_store_status(store_name: str):
         
         return {
             "store_name": store_name,
-            "namespace": f"store-{store_name}",
+            "namespace": store_mgr.k8s.ns_of(store_name),
             "status": status_info
         }
     
@@ -207,7 +240,7 @@ def get_store_status(store_name: str):
 
 
 @app.delete("/stores/{store_name}", response_model=DeleteStoreResponse, tags=["Stores"])
-def delete_store(store_name: str):
+async def delete_store(store_name: str, store_mgr: StoreManager = Depends(get_store_manager)):
     """
     Delete a WooCommerce store
     
@@ -217,12 +250,6 @@ def delete_store(store_name: str):
     
     **Warning:** This action is irreversible!
     """
-    if not store_mgr:
-        raise HTTPException(
-            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-            detail="Store Manager not initialized"
-        )
-    
     logger.info(f"Received request to delete store: {store_name}")
     
     # Check if store exists
@@ -233,7 +260,7 @@ def delete_store(store_name: str):
         )
     
     try:
-        store_mgr.delete_store(store_name)
+        await store_mgr.delete_store(store_name)
         
         return DeleteStoreResponse(
             status="success",
@@ -250,5 +277,16 @@ def delete_store(store_name: str):
 
 
 if __name__ == "__main__":
+    import os
+    import sys
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    # uvloop is not available on Windows. Each worker runs its own informer
+    # watches, so scale workers sparingly.
+    uvicorn.run(
+        "app.main:app",
+        host="0.0.0.0",
+        port=8000,
+        loop="asyncio" if sys.platform == "win32" else "uvloop",
+        http="httptools",
+        workers=int(os.getenv("API_WORKERS", "1"))
+    )
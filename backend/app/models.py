@@ -1,20 +1,35 @@
-from pydantic import BaseModel, EmailStr, Field
+from pydantic import BaseModel, ConfigDict, EmailStr, Field, field_validator
 from typing import Optional
+import re
+
+# Valid store names (lowercase, alphanumeric, hyphens)
+STORE_NAME_RE = re.compile(r"^[a-z0-9-]+$")
 
 
 class CreateStoreRequest(BaseModel):
     """Request model for creating a new store"""
-    store_name: str = Field(..., min_length=3, max_length=20, pattern="^[a-z0-9-]+$", 
+    store_name: str = Field(..., min_length=3, max_length=20,
+                             json_schema_extra={"pattern": STORE_NAME_RE.pattern},
                              description="Store name (lowercase, alphanumeric, hyphens only)")
     owner_email: EmailStr = Field(..., description="Store owner email address")
     
-    class Config:
-        json_schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "store_name": "my-awesome-store",
                 "owner_email": "owner@example.com"
             }
         }
+    )
+    
+    @field_validator("store_name")
+    @classmethod
+    def validate_store_name(cls, v: str) -> str:
+        """Check the store name against the precompiled pattern"""
+        # fullmatch, since "$" alone would also accept a trailing newline
+        if not STORE_NAME_RE.fullmatch(v):
+            raise ValueError("Store name must contain only lowercase letters, numbers and hyphens")
+        return v
 
 
 class StoreResponse(BaseModel):
@@ -25,6 +40,7 @@ class StoreResponse(BaseModel):
     admin_url: str
     owner_email: Optional[str] = None
     status: str = "active"
+    ready: bool = False
     created_at: Optional[str] = None
 
 
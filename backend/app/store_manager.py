@@ -1,53 +1,217 @@
-import subprocess
+import asyncio
+import json
+import os
+import shutil
 import secrets
 import logging
+import tempfile
 import time
 from datetime import datetime, timezone
+from typing import Optional
 from app.kubernetes_manager import KubernetesManager
 
 logger = logging.getLogger(__name__)
 
+# How long to wait for the WordPress pod to report ready after Helm returns
+WORDPRESS_READY_TIMEOUT_SECONDS = 120
+
+# First back-off delay when polling readiness or retrying plugin install (doubles each time)
+INITIAL_BACKOFF_SECONDS = 0.1
+MAX_BACKOFF_SECONDS = 5
+
+# How long a `helm version` probe result is trusted before re-checking
+HELM_CHECK_TTL_SECONDS = 60
+
+# Chart every store is installed from
+WORDPRESS_CHART = "bitnami/wordpress"
+
+# Directory the WordPress chart is pre-pulled into on warm-up
+CHART_CACHE_DIR = os.getenv("HELM_CHART_CACHE_DIR", os.path.join(tempfile.gettempdir(), "store-helm-charts"))
+
+# How long after a failed chart pull stores keep installing from the remote chart before pulling again
+CHART_RETRY_INTERVAL_SECONDS = 300
+
+# Age after which a scratch pull directory is treated as abandoned by a crashed worker
+CHART_PULL_STALE_SECONDS = 600
+
 
 class StoreManager:
     """Handles store creation, deletion, and management"""
     
     def __init__(self):
         self.k8s = KubernetesManager()
+        self._helm_installed = False
+        self._helm_checked_at = None
+        self._chart_ref = None
+        self._chart_failed_at = None
+        self._chart_lock = asyncio.Lock()
+    
+    async def warm_up(self):
+        """Probe Helm and pre-pull the WordPress chart ahead of the first store creation"""
+        if await self.check_helm_installed():
+            await self._get_chart_ref()
     
-    def _run_command(self, cmd: list[str], timeout: int = 300) -> tuple[bool, str, str]:
+    async def _run_command(self, cmd: list[str], timeout: int = 300, input: str = None) -> tuple[bool, str, str]:
         """
-        Run a shell command and return success status, stdout, stderr
+        Run a command without blocking the event loop and return success status, stdout, stderr
         
         Args:
             cmd: Command as list of strings
             timeout: Timeout in seconds
+            input: Text to pass to the command on stdin
             
         Returns:
             Tuple of (success, stdout, stderr)
         """
         try:
-            result = subprocess.run(
-                cmd,
-                capture_output=True,
-                text=True,
-                timeout=timeout,
-                check=False
+            proc = await asyncio.create_subprocess_exec(
+                *cmd,
+                stdin=asyncio.subprocess.PIPE if input is not None else None,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE
             )
-            success = result.returncode == 0
-            return success, result.stdout, result.stderr
-        except subprocess.TimeoutExpired:
-            logger.error(f"Command timed out after {timeout}s: {' '.join(cmd)}")
-            return False, "", f"Command timed out after {timeout}s"
+            try:
+                stdout, stderr = await asyncio.wait_for(
+                    proc.communicate(input.encode() if input is not None else None),
+                    timeout
+                )
+            except asyncio.TimeoutError:
+                proc.kill()
+                await proc.wait()
+                logger.error(f"Command timed out after {timeout}s: {' '.join(cmd)}")
+                return False, "", f"Command timed out after {timeout}s"
+            success = proc.returncode == 0
+            return success, stdout.decode(errors="replace"), stderr.decode(errors="replace")
         except Exception as e:
             logger.error(f"Command failed: {e}")
             return False, "", str(e)
     
-    def check_helm_installed(self) -> bool:
-        """Check if Helm is installed"""
-        success, _, _ = self._run_command(["helm", "version"])
+    async def _run_helm(self, args: list[str], timeout: int = 300, input: str = None) -> tuple[bool, str, str]:
+        """
+        Run a Helm CLI command and return success status, stdout, stderr
+        
+        Args:
+            args: Helm arguments (without the leading 'helm')
+            timeout: Timeout in seconds
+            input: Text to pass to Helm on stdin
+            
+        Returns:
+            Tuple of (success, stdout, stderr)
+        """
+        return await self._run_command(["helm", *args], timeout=timeout, input=input)
+    
+    async def _probe_helm(self) -> bool:
+        """Run `helm version` to see if Helm is usable"""
+        success, _, _ = await self._run_helm(["version"])
         return success
     
-    def create_store(self, store_name: str, owner_email: str) -> dict:
+    async def _get_chart_ref(self) -> str:
+        """
+        Get the chart to install stores from, pulling it into the local cache on first use
+        
+        While a pull is running, or within CHART_RETRY_INTERVAL_SECONDS of a
+        failed one, the remote chart is used instead of waiting or re-pulling.
+        """
+        if self._chart_ref is not None and os.path.isdir(self._chart_ref):
+            return self._chart_ref
+        if self._chart_lock.locked():
+            return WORDPRESS_CHART
+        if self._chart_failed_at is not None and time.monotonic() - self._chart_failed_at < CHART_RETRY_INTERVAL_SECONDS:
+            return WORDPRESS_CHART
+        
+        async with self._chart_lock:
+            self._chart_ref = await self._prepare_chart()
+            self._chart_failed_at = None if self._chart_ref else time.monotonic()
+            return self._chart_ref or WORDPRESS_CHART
+    
+    async def _prepare_chart(self) -> Optional[str]:
+        """
+        Refresh the Bitnami repo index and pull the WordPress chart into the local cache
+        
+        The chart is unpacked into a scratch directory and then renamed to
+        wordpress-<version>, so workers sharing CHART_CACHE_DIR share one copy
+        per chart version. Copies of other versions and abandoned scratch
+        directories are pruned afterwards.
+        
+        Returns:
+            Path of the unpacked chart, or None if refreshing or pulling failed
+        """
+        success, _, stderr = await self._run_helm(["repo", "update", "bitnami"], timeout=120)
+        if not success:
+            logger.warning(f"Helm repo update failed, using remote chart: {stderr}")
+            return None
+        
+        os.makedirs(CHART_CACHE_DIR, exist_ok=True)
+        download_dir = tempfile.mkdtemp(prefix=".pull-", dir=CHART_CACHE_DIR)
+        try:
+            success, _, stderr = await self._run_helm(
+                ["pull", WORDPRESS_CHART, "--untar", "--destination", download_dir],
+                timeout=120
+            )
+            if not success:
+                logger.warning(f"Helm chart pull failed, using remote chart: {stderr}")
+                return None
+            
+            pulled_dir = os.path.join(download_dir, "wordpress")
+            version = self._chart_version(pulled_dir)
+            if version is None:
+                logger.warning("Pulled chart has no version, using remote chart")
+                return None
+            
+            chart_dir = os.path.join(CHART_CACHE_DIR, f"wordpress-{version}")
+            try:
+                os.rename(pulled_dir, chart_dir)
+            except OSError:
+                # Another worker already cached this version
+                if not os.path.isdir(chart_dir):
+                    raise
+        except OSError as e:
+            logger.warning(f"Caching Helm chart failed, using remote chart: {e}")
+            return None
+        finally:
+            shutil.rmtree(download_dir, ignore_errors=True)
+        
+        self._prune_chart_cache(chart_dir)
+        logger.info(f"WordPress chart cached at {chart_dir}")
+        return chart_dir
+    
+    @staticmethod
+    def _chart_version(chart_dir: str) -> Optional[str]:
+        """Read the version field from an unpacked chart's Chart.yaml"""
+        try:
+            with open(os.path.join(chart_dir, "Chart.yaml")) as f:
+                for line in f:
+                    if line.startswith("version:"):
+                        return line.split(":", 1)[1].strip().strip("'\"") or None
+        except OSError:
+            pass
+        return None
+    
+    @staticmethod
+    def _prune_chart_cache(keep: str):
+        """
+        Remove cached charts other than keep, plus scratch directories left by interrupted pulls
+        
+        A worker still holding a pruned chart notices it is gone on its next
+        store creation and pulls again.
+        """
+        cutoff = time.time() - CHART_PULL_STALE_SECONDS
+        for entry in os.scandir(CHART_CACHE_DIR):
+            if not entry.is_dir(follow_symlinks=False) or entry.path == keep:
+                continue
+            if entry.name.startswith("wordpress-"):
+                shutil.rmtree(entry.path, ignore_errors=True)
+            elif entry.name.startswith(".pull-") and entry.stat().st_mtime < cutoff:
+                shutil.rmtree(entry.path, ignore_errors=True)
+    
+    async def check_helm_installed(self) -> bool:
+        """Check if Helm is installed (re-probed at most every HELM_CHECK_TTL_SECONDS)"""
+        if self._helm_checked_at is None or time.monotonic() - self._helm_checked_at > HELM_CHECK_TTL_SECONDS:
+            self._helm_installed = await self._probe_helm()
+            self._helm_checked_at = time.monotonic()
+        return self._helm_installed
+    
+    async def create_store(self, store_name: str, owner_email: str) -> dict:
         """
         Create a complete WooCommerce store
         
@@ -64,10 +228,11 @@ class StoreManager:
         logger.info(f"Creating store: {store_name}")
         
         # Validate Helm is installed
-        if not self.check_helm_installed():
+        if not await self.check_helm_installed():
             raise Exception("Helm is not installed or not in PATH")
         
-        # Check if namespace already exists
+        # Fast rejection from the informer cache; create_namespace below is the
+        # authoritative check
         if self.k8s.namespace_exists(store_name):
             raise Exception(f"Store '{store_name}' already exists")
         
@@ -75,83 +240,104 @@ class StoreManager:
         admin_password = secrets.token_urlsafe(16)
         db_password = secrets.token_urlsafe(16)
         
-        namespace = f"store-{store_name}"
+        namespace = self.k8s.ns_of(store_name)
         created_timestamp = datetime.now(timezone.utc).isoformat()
         
+        # Step 1: Create namespace with timestamp annotation. This stays outside
+        # the cleanup block so an existing store's namespace is never deleted.
+        logger.info(f"Creating namespace: {namespace}")
+        if not await asyncio.to_thread(
+            self.k8s.create_namespace,
+            store_name, 
+            annotations={
+                "owner-email": owner_email,
+                "store.urumi.ai/created-at": created_timestamp
+            }
+        ):
+            raise Exception(f"Store '{store_name}' already exists")
+        
         try:
-            # Step 1: Create namespace with timestamp annotation
-            logger.info(f"Creating namespace: {namespace}")
-            if not self.k8s.create_namespace(
-                store_name, 
-                annotations={
-                    "owner-email": owner_email,
-                    "store.urumi.ai/created-at": created_timestamp
-                }
-            ):
-                raise Exception(f"Failed to create namespace {namespace}")
-            
             # Step 2: Install WordPress via Helm
             logger.info(f"Installing WordPress for {store_name}")
-            helm_cmd = [
-                "helm", "install", store_name, "bitnami/wordpress",
+            # Values go in on stdin as one document (JSON is valid YAML), which
+            # keeps the passwords out of the process list
+            helm_values = {
+                "wordpressUsername": "admin",
+                "wordpressPassword": admin_password,
+                "wordpressEmail": owner_email,
+                "wordpressBlogName": f"{store_name} Store",
+                "mariadb": {
+                    "auth": {"password": db_password},
+                    "primary": {"persistence": {"size": "3Gi"}}
+                },
+                "ingress": {
+                    "enabled": True,
+                    "ingressClassName": "nginx",
+                    "hostname": f"{store_name}.localhost"
+                },
+                "persistence": {"size": "5Gi"}
+            }
+            helm_args = [
+                "install", store_name, await self._get_chart_ref(),
                 "--namespace", namespace,
-                "--set", f"wordpressUsername=admin",
-                "--set", f"wordpressPassword={admin_password}",
-                "--set", f"wordpressEmail={owner_email}",
-                "--set", f"wordpressBlogName={store_name} Store",
-                "--set", f"mariadb.auth.password={db_password}",
-                "--set", "ingress.enabled=true",
-                "--set", "ingress.ingressClassName=nginx",
-                "--set", f"ingress.hostname={store_name}.localhost",
-                "--set", "persistence.size=5Gi",
-                "--set", "mariadb.primary.persistence.size=3Gi",
+                "-f", "-",
                 "--wait", 
                 "--timeout=5m"
             ]
             
-            success, stdout, stderr = self._run_command(helm_cmd, timeout=360)
+            success, stdout, stderr = await self._run_helm(helm_args, timeout=360, input=json.dumps(helm_values))
             
             if not success:
                 logger.error(f"Helm install failed: {stderr}")
                 # Cleanup namespace on failure
-                self.k8s.delete_namespace(store_name)
+                await asyncio.to_thread(self.k8s.delete_namespace, store_name)
                 raise Exception(f"Helm installation failed: {stderr}")
             
             logger.info(f"WordPress installed successfully for {store_name}")
             
             # Step 3: Install WooCommerce plugin
+            if not await self._wait_for_wordpress_ready(store_name):
+                logger.warning(f"WordPress pod for {store_name} not ready after {WORDPRESS_READY_TIMEOUT_SECONDS}s")
+            
             logger.info(f"Installing WooCommerce plugin for {store_name}")
             max_retries = 5
+            delay = INITIAL_BACKOFF_SECONDS
             woocommerce_installed = False
             for attempt in range(max_retries):
+                error = None
                 try:
-                    if self._install_woocommerce(namespace, store_name):
+                    if await self._install_woocommerce(namespace, store_name):
                         logger.info(f"WooCommerce installed successfully for {store_name}")
                         woocommerce_installed = True
                         break
                 except Exception as e:
-                    if attempt < max_retries - 1:
-                        logger.warning(f"WooCommerce install attempt {attempt + 1} failed, retrying...")
-                        time.sleep(10)
-                    else:
-                        logger.warning(f"WooCommerce installation failed after {max_retries} attempts: {e}")
-                        # Don't fail the entire store creation if WooCommerce install fails
-                        # User can install it manually later
+                    error = e
+                
+                # Back off whether the attempt raised or just reported failure
+                if attempt < max_retries - 1:
+                    logger.warning(f"WooCommerce install attempt {attempt + 1} failed, retrying...")
+                    await asyncio.sleep(delay)
+                    delay = min(delay * 2, MAX_BACKOFF_SECONDS)
+                else:
+                    logger.warning(f"WooCommerce installation failed after {max_retries} attempts: {error or 'install command failed'}")
+                    # Don't fail the entire store creation if WooCommerce install fails
+                    # User can install it manually later
             
             # Step 4: Enable Cash on Delivery payment method
             if woocommerce_installed:
                 try:
                     logger.info(f"Enabling Cash on Delivery payment for {store_name}")
-                    self._enable_cod_payment(namespace, store_name)
+                    await self._enable_cod_payment(namespace, store_name)
                 except Exception as e:
                     logger.warning(f"Failed to enable COD payment: {e}")
             
             # Return store details
+            url = f"http://{store_name}.localhost"
             return {
                 "store_name": store_name,
                 "namespace": namespace,
-                "url": f"http://{store_name}.localhost",
-                "admin_url": f"http://{store_name}.localhost/wp-admin",
+                "url": url,
+                "admin_url": f"{url}/wp-admin",
                 "owner_email": owner_email,
                 "created_at": created_timestamp,
                 "credentials": {
@@ -165,12 +351,31 @@ class StoreManager:
             logger.error(f"Store creation failed: {e}")
             # Cleanup on failure
             try:
-                self.k8s.delete_namespace(store_name)
+                await asyncio.to_thread(self.k8s.delete_namespace, store_name)
             except:
                 pass
             raise
     
-    def _install_woocommerce(self, namespace: str, store_name: str) -> bool:
+    async def _wait_for_wordpress_ready(self, store_name: str) -> bool:
+        """
+        Poll the pod cache until the WordPress pod is ready, backing off exponentially
+        
+        Args:
+            store_name: Name of the store
+            
+        Returns:
+            True if the pod became ready before the timeout, False otherwise
+        """
+        deadline = time.monotonic() + WORDPRESS_READY_TIMEOUT_SECONDS
+        delay = INITIAL_BACKOFF_SECONDS
+        while not self.k8s.is_wordpress_ready(store_name):
+            if time.monotonic() >= deadline:
+                return False
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, MAX_BACKOFF_SECONDS)
+        return True
+    
+    async def _install_woocommerce(self, namespace: str, store_name: str) -> bool:
         """
         Install WooCommerce plugin after WordPress is ready
         
@@ -182,28 +387,17 @@ class StoreManager:
             True if successful, False otherwise
         """
         # Get WordPress pod name
-        get_pod_cmd = [
-            "kubectl", "get", "pods",
-            "-n", namespace,
-            "-l", "app.kubernetes.io/name=wordpress",
-            "-o", "jsonpath={.items[0].metadata.name}"
-        ]
-        
-        success, pod_name, stderr = self._run_command(get_pod_cmd)
-        if not success or not pod_name:
-            logger.error(f"Failed to get WordPress pod name: {stderr}")
+        pod_name = self.k8s.get_wordpress_pod_name(store_name)
+        if not pod_name:
+            logger.error(f"Failed to get WordPress pod name in {namespace}")
             return False
         
-        pod_name = pod_name.strip()
         logger.info(f"WordPress pod name: {pod_name}")
         
         # Install WooCommerce plugin
-        install_cmd = [
-            "kubectl", "exec", "-n", namespace, pod_name,
-            "--", "wp", "plugin", "install", "woocommerce", "--activate"
-        ]
+        install_cmd = ["wp", "plugin", "install", "woocommerce", "--activate"]
         
-        success, stdout, stderr = self._run_command(install_cmd, timeout=120)
+        success, stdout, stderr = await asyncio.to_thread(self.k8s.exec_in_pod, namespace, pod_name, install_cmd, timeout=120)
         
         if success:
             logger.info(f"WooCommerce installed: {stdout}")
@@ -212,7 +406,7 @@ class StoreManager:
             logger.error(f"WooCommerce installation failed: {stderr}")
             return False
     
-    def _enable_cod_payment(self, namespace: str, store_name: str) -> bool:
+    async def _enable_cod_payment(self, namespace: str, store_name: str) -> bool:
         """
         Enable Cash on Delivery payment method in WooCommerce
         
@@ -224,29 +418,19 @@ class StoreManager:
             True if successful, False otherwise
         """
         # Get WordPress pod name
-        get_pod_cmd = [
-            "kubectl", "get", "pods",
-            "-n", namespace,
-            "-l", "app.kubernetes.io/name=wordpress",
-            "-o", "jsonpath={.items[0].metadata.name}"
-        ]
-        
-        success, pod_name, stderr = self._run_command(get_pod_cmd)
-        if not success or not pod_name:
-            logger.error(f"Failed to get WordPress pod name: {stderr}")
+        pod_name = self.k8s.get_wordpress_pod_name(store_name)
+        if not pod_name:
+            logger.error(f"Failed to get WordPress pod name in {namespace}")
             return False
         
-        pod_name = pod_name.strip()
-        
         # Enable COD payment gateway
         enable_cod_cmd = [
-            "kubectl", "exec", "-n", namespace, pod_name,
-            "--", "wp", "option", "update", "woocommerce_cod_settings",
+            "wp", "option", "update", "woocommerce_cod_settings",
             '{"enabled":"yes","title":"Cash on Delivery","description":"Pay with cash upon delivery."}',
             "--format=json"
         ]
         
-        success, stdout, stderr = self._run_command(enable_cod_cmd, timeout=30)
+        success, stdout, stderr = await asyncio.to_thread(self.k8s.exec_in_pod, namespace, pod_name, enable_cod_cmd, timeout=30)
         
         if success:
             logger.info(f"COD payment enabled for {store_name}")
@@ -255,11 +439,10 @@ class StoreManager:
             # Try alternative method - directly set the option
             logger.warning(f"First method failed, trying alternative approach")
             alt_cmd = [
-                "kubectl", "exec", "-n", namespace, pod_name,
-                "--", "bash", "-c",
+                "bash", "-c",
                 "wp option patch update woocommerce_cod_settings enabled yes && wp option patch update woocommerce_cod_settings title 'Cash on Delivery'"
             ]
-            success, stdout, stderr = self._run_command(alt_cmd, timeout=30)
+            success, stdout, stderr = await asyncio.to_thread(self.k8s.exec_in_pod, namespace, pod_name, alt_cmd, timeout=30)
             if success:
                 logger.info(f"COD payment enabled via alternative method")
                 return True
@@ -274,28 +457,28 @@ class StoreManager:
         Returns:
             List of store information dictionaries (excludes terminating stores)
         """
-        namespaces = self.k8s.list_store_namespaces()
+        # Skip terminating namespaces
+        namespaces = [ns for ns in self.k8s.list_store_namespaces() if ns["status"] != "Terminating"]
+        statuses = self.get_all_store_statuses(namespaces)
         stores = []
         
         for ns in namespaces:
-            # Skip terminating namespaces
-            if ns["status"] == "Terminating":
-                continue
-                
             store_name = ns["store_name"]
+            url = f"http://{store_name}.localhost"
             stores.append({
                 "name": store_name,
                 "namespace": ns["name"],
-                "url": f"http://{store_name}.localhost",
-                "admin_url": f"http://{store_name}.localhost/wp-admin",
+                "url": url,
+                "admin_url": f"{url}/wp-admin",
                 "created": ns["created"],
                 "created_at": ns.get("created_at"),
-                "status": ns["status"]
+                "status": ns["status"],
+                "ready": statuses[store_name]["ready"]
             })
         
         return stores
     
-    def delete_store(self, store_name: str) -> bool:
+    async def delete_store(self, store_name: str) -> bool:
         """
         Delete a store completely
         
@@ -310,23 +493,23 @@ class StoreManager:
         """
         logger.info(f"Deleting store: {store_name}")
         
-        namespace = f"store-{store_name}"
+        namespace = self.k8s.ns_of(store_name)
         
         # Step 1: Uninstall Helm release
         logger.info(f"Uninstalling Helm release: {store_name}")
-        helm_cmd = [
-            "helm", "uninstall", store_name,
+        helm_args = [
+            "uninstall", store_name,
             "--namespace", namespace
         ]
         
-        success, stdout, stderr = self._run_command(helm_cmd)
+        success, stdout, stderr = await self._run_helm(helm_args)
         if not success:
             logger.warning(f"Helm uninstall failed (may not exist): {stderr}")
             # Continue anyway to delete namespace
         
         # Step 2: Delete namespace (this deletes everything inside)
         logger.info(f"Deleting namespace: {namespace}")
-        if not self.k8s.delete_namespace(store_name):
+        if not await asyncio.to_thread(self.k8s.delete_namespace, store_name):
             raise Exception(f"Failed to delete namespace {namespace}")
         
         logger.info(f"Store {store_name} deleted successfully")
@@ -345,8 +528,31 @@ class StoreManager:
         if not self.k8s.namespace_exists(store_name):
             return {"exists": False}
         
-        pods = self.k8s.get_pods_in_namespace(store_name)
+        return self._status_from_pods(self.k8s.get_pods_in_namespace(store_name))
+    
+    def get_all_store_statuses(self, namespaces: list[dict] = None) -> dict[str, dict]:
+        """
+        Get detailed status of many stores from one pod cache snapshot
+        
+        Args:
+            namespaces: Store namespaces as returned by list_store_namespaces
+                (defaults to every store that is not terminating)
+            
+        Returns:
+            Dictionary mapping store name to its status details
+        """
+        if namespaces is None:
+            namespaces = [ns for ns in self.k8s.list_store_namespaces() if ns["status"] != "Terminating"]
+        pods_by_namespace = self.k8s.get_all_store_pods()
         
+        return {
+            ns["store_name"]: self._status_from_pods(pods_by_namespace.get(ns["name"], []))
+            for ns in namespaces
+        }
+    
+    @staticmethod
+    def _status_from_pods(pods: list[dict]) -> dict:
+        """Build the status details of an existing store from its pods"""
         return {
             "exists": True,
             "pods": pods,